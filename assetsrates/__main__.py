@@ -0,0 +1,16 @@
+"""Run the app by aiohttp.web script on uvloop event loop.
+
+Usage: python -m assetsrates [-H HOSTNAME] [-P PORT] [-U PATH]
+"""
+
+import asyncio
+import sys
+
+import uvloop
+from aiohttp.web import main
+
+
+# aiohttp.web script creates event loop by current policy
+asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+main(["assetsrates.app:create_app", *sys.argv[1:]])
@@ -4,7 +4,7 @@ from collections.abc import AsyncGenerator
 from aiohttp.web import Application
 from aiohttp.web import get as route_get
 
-from . import ratescrawler, storage, websockets
+from . import pubsub, ratescrawler, storage, websockets
 
 
 def create_app(argv: list[str] | None = None) -> Application:
@@ -16,6 +16,7 @@ def create_app(argv: list[str] | None = None) -> Application:
 
     app = Application()
     app.cleanup_ctx.append(init_db)
+    app.cleanup_ctx.append(history_points_listener)
     app.cleanup_ctx.append(ratescrawler_task)
     app.add_routes([route_get("/", websockets.ws_handler)])
     return app
@@ -28,6 +29,18 @@ async def init_db(app: Application) -> AsyncGenerator[None, None]:
         yield
 
 
+async def history_points_listener(
+    app: Application,
+) -> AsyncGenerator[None, None]:
+    """Application startup/cleanup handler for publishing DB notifications."""
+    if storage.CROSS_PROCESS_PUBSUB:
+        async with storage.listen_history_points(pubsub.channels.publish):
+            yield
+
+    else:
+        yield
+
+
 async def ratescrawler_task(app: Application) -> AsyncGenerator[None, None]:
     """Application startup/cleanup handler for running ratescrawler task."""
     app["ratescrawler_task"] = asyncio.create_task(ratescrawler.crawl())
@@ -1,5 +1,6 @@
 """Module provides universal interface for diffenet JSON implementations."""
 
+from collections.abc import Callable
 from typing import Any
 
 import orjson
@@ -10,12 +11,21 @@ __all__ = (
     "JSONDecodeError",
     "loads",
     "dumps",
+    "dumpb",
 )
 
 
-def loads(raw_data: bytes | str) -> Any:
-    return orjson.loads(raw_data)
+# no wrapper function, so every parsed message saves one Python call
+loads = orjson.loads
 
 
 def dumps(obj: Any) -> str:
     return orjson.dumps(obj).decode("utf-8")
+
+
+def dumpb(obj: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    """Return encoded object.
+
+    Optional default is called for objects which are not supported natively.
+    """
+    return orjson.dumps(obj, default=default)
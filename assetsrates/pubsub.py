@@ -1,57 +1,136 @@
 from __future__ import annotations
 
-from asyncio import Queue
-from collections import defaultdict
+from asyncio import Event
+from collections import deque
 from collections.abc import AsyncGenerator
 from contextlib import (
     asynccontextmanager,
 )
-from typing import Final
+from itertools import islice
+from typing import TYPE_CHECKING, Final
 
-from .storage import HistoryPoint, subscription_manager
+
+if TYPE_CHECKING:
+    from .storage import HistoryPoint
 
 
 # TODO: Ask about queue maxsize for subscribers
 SUBSCRIBER_QUEUE_MAXSIZE = 100
 
 
+class _Channel:
+    """Ring buffer of last messages published to channel.
+
+    The buffer is shared by all channel subscribers: publish() appends message
+    once and wakes up all waiting subscribers by single Event, subscribers
+    track their read positions themselves.
+    """
+
+    __slots__ = (
+        "buffer",
+        "event",
+        "subscribers_count",
+        "tail",
+    )
+
+    buffer: deque[HistoryPoint]
+    event: Event
+    subscribers_count: int
+    tail: int  # total number of messages published to channel
+
+    def __init__(self) -> None:
+        self.buffer = deque(maxlen=SUBSCRIBER_QUEUE_MAXSIZE)
+        self.event = Event()
+        self.subscribers_count = 0
+        self.tail = 0
+
+    def publish(self, message: HistoryPoint) -> None:
+        self.buffer.append(message)
+        self.tail += 1
+
+        # wake up current waiters, new waiters will wait for the next message
+        self.event.set()
+        self.event = Event()
+
+
+class Subscription:
+    """Reader of messages published to channel after subscription.
+
+    If subscriber falls behind for more than SUBSCRIBER_QUEUE_MAXSIZE messages,
+    the oldest unread messages are lost.
+    """
+
+    __slots__ = (
+        "_channel",
+        "_position",
+    )
+
+    _channel: _Channel
+    _position: int
+
+    def __init__(self, channel: _Channel) -> None:
+        self._channel = channel
+        self._position = channel.tail
+
+    async def get(self) -> HistoryPoint:
+        """Return next message, wait for new one if all are read."""
+        channel = self._channel
+
+        while self._position == channel.tail:
+            await channel.event.wait()
+
+        return self.drain(1)[0]
+
+    def drain(self, max_count: int = 32) -> list[HistoryPoint]:
+        """Return up to max_count unread messages without wait."""
+        channel = self._channel
+        buffer = channel.buffer
+
+        # messages which are not in buffer anymore are skipped
+        unread = min(channel.tail - self._position, len(buffer))
+        count = min(unread, max_count)
+        start = len(buffer) - unread
+
+        self._position = channel.tail - unread + count
+        return list(islice(buffer, start, start + count))
+
+
 class ChannelsManager:
-    __slots__ = ("_subscriptions",)
+    __slots__ = ("_channels",)
 
-    _subscriptions: dict[str, set[Queue[HistoryPoint]]]
+    # Channels with at least one subscriber
+    _channels: dict[str, _Channel]
 
     def __init__(self) -> None:
-        self._subscriptions = defaultdict(set)
+        self._channels = {}
 
     @asynccontextmanager
     async def subscribe(
         self,
         channel: str,
-    ) -> AsyncGenerator[Queue[HistoryPoint], None]:
-        subscription: Queue[HistoryPoint] = Queue(
-            maxsize=SUBSCRIBER_QUEUE_MAXSIZE,
-        )
+    ) -> AsyncGenerator[Subscription, None]:
+        channel_ = self._channels.get(channel)
+
+        if channel_ is None:
+            channel_ = self._channels[channel] = _Channel()
 
-        self._subscriptions[channel].add(subscription)
+        channel_.subscribers_count += 1
 
         try:
-            async with subscription_manager.subscribe(
-                channel,
-                self.publish,
-            ):
-                yield subscription
+            yield Subscription(channel_)
 
         finally:
-            self._subscriptions[channel].remove(subscription)
+            channel_.subscribers_count -= 1
 
-            if not self._subscriptions[channel]:
-                del self._subscriptions[channel]
+            if not channel_.subscribers_count:
+                del self._channels[channel]
 
     def publish(self, channel: str, point: HistoryPoint) -> None:
-        for subscription in self._subscriptions[channel]:
-            # TODO: Ask what to do if queue is full
-            if not subscription.full():
-                subscription.put_nowait(point)
+        # messages to channels without subscribers are not stored
+        channel_ = self._channels.get(channel)
+
+        if channel_ is not None:
+            channel_.publish(point)
 
 
 channels: Final[ChannelsManager] = ChannelsManager()
@@ -2,13 +2,14 @@ import asyncio
 import logging
 import os
 import time
-from decimal import Decimal
+from collections.abc import Mapping
+from decimal import Context, Decimal
 from typing import Any, Final
 
-from aiohttp import ClientError, ClientSession
+from aiohttp import ClientError, ClientSession, TCPConnector
 
 from . import json
-from .storage import Asset, HistoryPoint, get_available_assets, save_points
+from .storage import Asset, HistoryPoint, get_assets_by_symbol, save_points
 
 
 log = logging.getLogger(__name__)
@@ -18,6 +19,13 @@ RATES_URL: Final[str] = os.environ.get("RATES_URL") or ""
 assert RATES_URL, "RATES_URL env var is not set"
 
 REQUEST_PERIOD: Final[int] = 1
+VALUE_QUANTUM: Final[Decimal] = Decimal("0.00000001")  # 8 decimal places
+
+# default context has 28 digits precision and quantize() fails for values
+# with more digits, so precision is enough for any float with 8 places
+_QUANTIZE_CONTEXT: Final[Context] = Context(prec=320)
+
+_decimal_from_float = Decimal.from_float
 
 
 async def crawl() -> None:
@@ -27,16 +35,24 @@ async def crawl() -> None:
 
     log.info("Start ratescrawler task")
 
+    # the same host is requested every second, so keep the connection alive
+    connector = TCPConnector(limit=4, ttl_dns_cache=300, keepalive_timeout=60)
+
     try:
-        async with ClientSession() as session:
+        async with ClientSession(
+            connector=connector,
+            raise_for_status=True,
+        ) as session:
+            next_tick = time.monotonic()
+
             while True:
                 ts = time.time()
 
                 try:
                     log.debug("New request to %s", RATES_URL)
                     raw_data = await _make_request(session, RATES_URL)
-                    assets = await get_available_assets()
-                    points = parse_raw(raw_data, int(ts), assets)
+                    symbol_to_asset = await get_assets_by_symbol()
+                    points = parse_raw(raw_data, int(ts), symbol_to_asset)
 
                     if points:
                         await save_points(points)
@@ -47,7 +63,11 @@ async def crawl() -> None:
                 except Exception:
                     log.exception("Unexpected exception:")
 
-                sleep_time = ts - time.time() + REQUEST_PERIOD
+                # Monotonic deadlines do not drift and are not affected by
+                # system clock changes. Missed ticks are skipped, not repeated.
+                now = time.monotonic()
+                next_tick = max(next_tick + REQUEST_PERIOD, now)
+                sleep_time = next_tick - now
                 log.debug("Sleep for %f", sleep_time)
                 await asyncio.sleep(sleep_time)
 
@@ -57,39 +77,54 @@ async def crawl() -> None:
     log.info("Finish ratescrawler task")
 
 
-def parse_raw(raw: bytes, ts: int, assets: list[Asset]) -> list[HistoryPoint]:
+def parse_raw(
+    raw: bytes,
+    ts: int,
+    symbol_to_asset: Mapping[str, Asset],
+) -> list[HistoryPoint]:
     """Parse raw response bytes to Points list and return it."""
     # TODO: add validation and errors handling
 
-    raw_json = raw.strip().removeprefix(b"null(").removesuffix(b");")
-    data: dict[str, list[dict[str, Any]]] = json.loads(raw_json)
+    data: dict[str, list[dict[str, Any]]] = json.loads(_unwrap_jsonp(raw))
     rates = data.get("Rates", [])
 
-    result: list[HistoryPoint] = []
+    return [
+        _make_point(symbol_to_asset[rate["Symbol"]], ts, rate)
+        for rate in rates
+        if rate.get("Symbol") in symbol_to_asset
+    ]
+
+
+def _unwrap_jsonp(raw: bytes) -> bytes:
+    """Return JSON from "null(...);" envelope."""
+    raw = raw.strip()
+
+    # slice once instead of creating copy on every removeprefix/removesuffix
+    if raw.startswith(b"null(") and raw.endswith(b");"):
+        return raw[5:-2]
 
-    symbol_to_asset = {i.symbol: i for i in assets}
+    return raw
 
-    for rate in rates:
-        symbol = rate.get("Symbol")
 
-        if symbol in symbol_to_asset:
-            # TODO: check Bid and Ask valies before converting to Decimal
-            bid = Decimal(str(rate.get("Bid") or 0.0))
-            ask = Decimal(str(rate.get("Ask") or 0.0))
-            value = (bid + ask) / 2
+def _make_point(asset: Asset, ts: int, rate: dict[str, Any]) -> HistoryPoint:
+    # TODO: check Bid and Ask valies before converting to Decimal
+    bid = rate.get("Bid") or 0.0
+    ask = rate.get("Ask") or 0.0
 
-            point = HistoryPoint(
-                asset=symbol_to_asset[symbol],
-                timestamp=ts,
-                value=value,
-            )
+    if isinstance(bid, int | float) and isinstance(ask, int | float):
+        # exact conversion of float is cheaper than parsing its repr,
+        # halves are summed to not overflow on sum of two large values
+        value = _decimal_from_float(bid * 0.5 + ask * 0.5)
 
-            result.append(point)
+    else:
+        # numeric strings are accepted as well
+        value = (Decimal(str(bid)) + Decimal(str(ask))) / 2
 
-    return result
+    value = value.quantize(VALUE_QUANTUM, context=_QUANTIZE_CONTEXT)
+    return HistoryPoint(asset, ts, value, float(value))
 
 
 async def _make_request(session: ClientSession, url: str) -> bytes:
-    async with session.get(url) as resp:
-        resp.raise_for_status()
-        return await resp.read()
+    # session raises on error status and read() releases the connection
+    resp = await session.get(url)
+    return await resp.read()
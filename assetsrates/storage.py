@@ -5,12 +5,8 @@ from __future__ import annotations
 import logging
 import os
 import time
-from collections.abc import AsyncGenerator, Callable
-from contextlib import (
-    AbstractAsyncContextManager,
-    asynccontextmanager,
-    nullcontext,
-)
+from collections.abc import AsyncGenerator, Callable, Mapping
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from functools import partial
 from typing import TYPE_CHECKING, Final, NamedTuple, TypeAlias
@@ -19,7 +15,7 @@ from asyncpg import Pool, Record
 from asyncpg import create_pool as _create_pool
 from asyncpg.pool import PoolConnectionProxy
 
-from . import json
+from .pubsub import channels
 
 
 if TYPE_CHECKING:
@@ -42,25 +38,49 @@ class HistoryPoint(NamedTuple):
     asset: Asset
     timestamp: int
     value: Decimal
+    # value converted once on creation, to not convert it on every send
+    float_value: float
 
 
 PG_URL: Final[str] = os.environ.get("PG_URL") or "postgres://postgres@postgres"
 HISTORY_RANGE: Final[int] = 1800  # last 30 minutes
+ASSETS_CACHE_TTL: Final[int] = 60
+
+# Publish new points by PostgreSQL notifications, so they are received by all
+# app processes. Otherwise points are published to in-process channels only.
+CROSS_PROCESS_PUBSUB: Final[bool] = bool(
+    os.environ.get("CROSS_PROCESS_PUBSUB")
+)
+
+
+class _AssetsCache(NamedTuple):
+    expires_at: float
+    assets: tuple[Asset, ...]
+    assets_by_id: dict[int, Asset]
+    assets_by_symbol: dict[str, Asset]
 
 
 _connection_pool: Pool[Record] | None = None
+_assets_cache: _AssetsCache | None = None
 
 
 @asynccontextmanager
 async def create_pool() -> AsyncGenerator[Pool[Record], None]:
-    global _connection_pool
+    global _connection_pool, _assets_cache
 
     # TODO: hide credetials from logs
     log.debug("Connect to database: %s", PG_URL)
 
     try:
         try:
-            _connection_pool = await _create_pool(PG_URL)
+            # asyncpg prepares every query once per connection and keeps it
+            # in statement cache, disable expiration of cached statements to
+            # not re-prepare the same few queries every 5 minutes
+            _connection_pool = await _create_pool(
+                PG_URL,
+                max_cached_statement_lifetime=0,
+                server_settings=_get_server_settings(),
+            )
 
         except Exception as e:
             log.error("Could not connect to %s: %s", PG_URL, e)
@@ -74,9 +94,19 @@ async def create_pool() -> AsyncGenerator[Pool[Record], None]:
             await _connection_pool.close()
 
         _connection_pool = None
+        _assets_cache = None
         log.debug("Connections to database are closed")
 
 
+def _get_server_settings() -> dict[str, str]:
+    # "history_points_notify" trigger calls pg_notify only for sessions with
+    # this setting, so inserts are not notified without CROSS_PROCESS_PUBSUB
+    if CROSS_PROCESS_PUBSUB:
+        return {"assetsrates.notify_history_points": "on"}
+
+    return {}
+
+
 @asynccontextmanager
 async def acquire_connection() -> AsyncGenerator[Connection, None]:
     assert _connection_pool, "DB connection pool is not inited"
@@ -85,24 +115,43 @@ async def acquire_connection() -> AsyncGenerator[Connection, None]:
         yield conn
 
 
-async def get_available_assets() -> list[Asset]:
-    async with acquire_connection() as conn:
-        records = await conn.fetch("SELECT id, symbol FROM assets;")
+async def get_available_assets() -> tuple[Asset, ...]:
+    """Return all assets.
 
-    return [Asset(**i) for i in records]
+    Assets are changed rarely, so they are cached for ASSETS_CACHE_TTL seconds
+    and the same tuple is returned until cache expiration.
+    """
+    return (await _get_assets_cache()).assets
 
 
 async def get_asset_by_id(id: int) -> Asset | None:
-    async with acquire_connection() as conn:
-        record = await conn.fetchrow(
-            "SELECT id, symbol FROM assets WHERE id=$1;",
-            id,
-        )
+    return (await _get_assets_cache()).assets_by_id.get(id)
+
+
+async def get_assets_by_symbol() -> Mapping[str, Asset]:
+    """Return assets by symbol, cached the same way as available assets."""
+    return (await _get_assets_cache()).assets_by_symbol
 
-    if record is not None:
-        return Asset(**record)
 
-    return None
+async def _get_assets_cache() -> _AssetsCache:
+    global _assets_cache
+
+    now = time.monotonic()
+
+    if _assets_cache is None or _assets_cache.expires_at <= now:
+        async with acquire_connection() as conn:
+            records = await conn.fetch("SELECT id, symbol FROM assets;")
+
+        assets = tuple(Asset(*i) for i in records)
+
+        _assets_cache = _AssetsCache(
+            expires_at=now + ASSETS_CACHE_TTL,
+            assets=assets,
+            assets_by_id={i.id: i for i in assets},
+            assets_by_symbol={i.symbol: i for i in assets},
+        )
+
+    return _assets_cache
 
 
 async def save_points(points: list[HistoryPoint]) -> None:
@@ -111,29 +160,32 @@ async def save_points(points: list[HistoryPoint]) -> None:
         VALUES ($1, to_timestamp($2), $3);
     """
 
-    async with acquire_connection() as conn:
-        for point in points:
-            await conn.execute(
-                sql,
-                point.asset.id,
-                point.timestamp,
-                point.value,
-            )
+    rows = [(i.asset.id, i.timestamp, i.value) for i in points]
 
-            await conn.execute(
-                "SELECT pg_notify($1, $2);",
-                point.asset.symbol,
-                _dump_history_point(point),
-            )
+    # executemany() sends the whole batch in a single round-trip
+    async with acquire_connection() as conn:
+        await conn.executemany(sql, rows)
 
+    # level is checked once per batch instead of once per point
+    if log.isEnabledFor(logging.DEBUG):
+        for point in points:
             log.debug('New history point for "%s" asset', point.asset.symbol)
 
+    # with CROSS_PROCESS_PUBSUB points are published by listener of
+    # notifications from "history_points_notify" trigger
+    if not CROSS_PROCESS_PUBSUB:
+        for point in points:
+            channels.publish(point.asset.symbol, point)
+
 
 async def get_asset_history(asset: Asset) -> list[HistoryPoint]:
     from_ts = time.time() - HISTORY_RANGE
 
     sql = """
-        SELECT date_part('epoch', timestamp)::integer as timestamp, value
+        SELECT
+            date_part('epoch', timestamp)::integer as timestamp,
+            value,
+            value::double precision as float_value
         FROM history_points
         WHERE asset_id=$1 AND timestamp>=to_timestamp($2);
     """
@@ -145,95 +197,54 @@ async def get_asset_history(asset: Asset) -> list[HistoryPoint]:
             from_ts,
         )
 
-    return [HistoryPoint(asset=asset, **i) for i in records]
+    # columns are selected in fields order, so records are unpacked
+    # positionally without building kwargs dict for every point
+    return [HistoryPoint(asset, *i) for i in records]
 
 
-class SubscriptionManager:
-    __slots__ = (
-        "_channels",
-        "_connection",
-    )
+@asynccontextmanager
+async def listen_history_points(
+    callback: Callable[[str, HistoryPoint], None],
+) -> AsyncGenerator[None, None]:
+    """Pass new history points of available assets to callback.
 
-    _channels: set[str]
-    _connection: Connection | None
-
-    log = logging.getLogger(f"{__name__}.SubscriptionManager")
-
-    def __init__(self) -> None:
-        self._channels = set()
-        self._connection = None
-
-    @asynccontextmanager
-    async def subscribe(
-        self,
-        channel: str,
-        callback: Callable[[str, HistoryPoint], None],
-    ) -> AsyncGenerator[None, None]:
-        _callback = partial(self._subscribe_callback, callback=callback)
-        new_channel = channel not in self._channels
-
-        async with self._acquire() as conn:
-            try:
-                if new_channel:
-                    self.log.debug("Subscribe to channel: %s", channel)
-                    await conn.add_listener(channel, _callback)
-                    self._channels.add(channel)
-
-                yield
-
-            finally:
-                if new_channel:
-                    await conn.remove_listener(channel, _callback)
-                    self._channels.remove(channel)
-                    self.log.debug("Unubscribe from channel: %s", channel)
-
-    def _subscribe_callback(
-        self,
-        connection: Connection,
-        pid: int,
-        channel: str,
-        payload: str,
-        callback: Callable[[str, HistoryPoint], None],
-    ) -> None:
-        callback(channel, _load_history_point(payload))
-
-    @asynccontextmanager
-    async def _acquire(self) -> AsyncGenerator[Connection, None]:
-        acquire_ctx: AbstractAsyncContextManager[Connection]
-        reset_conn = False
-
-        if self._connection is None:
-            acquire_ctx = acquire_connection()
-            reset_conn = True
-            self.log.debug("Acquire connection")
-
-        else:
-            acquire_ctx = nullcontext(self._connection)
+    All notifications are received on a single connection which is held until
+    exit. Channel name is asset's symbol, assets are loaded once on enter.
+    """
+    symbols = [i.symbol for i in await get_available_assets()]
+    listener = partial(_notification_listener, callback=callback)
 
+    async with acquire_connection() as conn:
         try:
-            async with acquire_ctx as self._connection:
-                yield self._connection
+            for symbol in symbols:
+                await conn.add_listener(symbol, listener)
 
-        finally:
-            if reset_conn:
-                self._connection = None
-                self.log.debug("Release connection")
+            log.debug("Listen for history points: %s", ", ".join(symbols))
+            yield
 
+        finally:
+            for symbol in symbols:
+                await conn.remove_listener(symbol, listener)
 
-subscription_manager: Final[SubscriptionManager] = SubscriptionManager()
+            log.debug("Stop listening for history points")
 
 
-def _dump_history_point(point: HistoryPoint) -> str:
-    return json.dumps(
-        (
-            point.asset.id,
-            point.asset.symbol,
-            point.timestamp,
-            str(point.value),
-        ),
-    )
+def _notification_listener(
+    connection: Connection,
+    pid: int,
+    channel: str,
+    payload: str,
+    callback: Callable[[str, HistoryPoint], None],
+) -> None:
+    callback(channel, _load_history_point(payload))
 
 
 def _load_history_point(payload: str) -> HistoryPoint:
-    id, symbol, timestamp, value = json.loads(payload)
-    return HistoryPoint(Asset(id, symbol), timestamp, Decimal(value))
+    # symbol is the last field, so it may contain any characters
+    id, timestamp, value, symbol = payload.split("\t", 3)
+    return HistoryPoint(
+        Asset(int(id), symbol),
+        int(timestamp),
+        Decimal(value),
+        float(value),
+    )
@@ -3,12 +3,15 @@
 import asyncio
 import logging
 from collections.abc import AsyncGenerator
+from functools import cache, lru_cache
 from typing import Any, Final
 
+from aiohttp import WSMsgType
+from aiohttp.http import WebSocketWriter
 from aiohttp.web import Request, WebSocketResponse
 
 from . import json
-from .pubsub import channels
+from .pubsub import Subscription, channels
 from .storage import (
     Asset,
     HistoryPoint,
@@ -23,11 +26,40 @@ log: logging.Logger = logging.getLogger(__name__)
 
 ACTION_ASSETS: Final[str] = "assets"
 ACTION_SUBSCRIBE: Final[str] = "subscribe"
+ACTIONS: Final[frozenset[str]] = frozenset((ACTION_ASSETS, ACTION_SUBSCRIBE))
+
+POINT_FRAMES_CACHE_SIZE: Final[int] = 1024
+POINTS_BATCH_MAX_SIZE: Final[int] = 64
+
+
+# WebSocketWriter.send() of aiohttp 3.9 writes bytes as TEXT frame
+_WRITER_SENDS_BYTES: Final[bool] = hasattr(WebSocketWriter, "send")
+
+
+class JSONWebSocketResponse(WebSocketResponse):
+    """Websocket response which sends JSON messages encoded by orjson."""
+
+    async def send_encoded(self, frame: bytes) -> None:
+        """Send encoded JSON message as TEXT frame.
+
+        send_str() accepts only str, so bytes are passed to the writer
+        directly to avoid decoding them just to be encoded back. Writer API
+        is private, see aiohttp pin in requirements/main.in, so frame is sent
+        by send_str() if writer has no such method.
+        """
+        if not _WRITER_SENDS_BYTES:
+            await self.send_str(frame.decode())
+            return
+
+        if self._writer is None:
+            raise RuntimeError("Call .prepare() first")
+
+        await self._writer.send(frame, binary=False)
 
 
 async def ws_handler(request: Request) -> WebSocketResponse:
     """Handle new websocket connections."""
-    ws = WebSocketResponse()
+    ws = JSONWebSocketResponse()
     await ws.prepare(request)
 
     log.debug("New websocket connection")
@@ -42,8 +74,11 @@ async def ws_handler(request: Request) -> WebSocketResponse:
 
             elif action == ACTION_SUBSCRIBE:
                 if subscribe_task is not None:
-                    await _cancel_task(subscribe_task)
-                    subscribe_task = None
+                    # Do not wait for cancellation: task can not send
+                    # anything after cancel() and its cleanup is synchronous
+                    subscribe_task.cancel()
+                    # task may be already failed, so its exception is logged
+                    subscribe_task.add_done_callback(_log_task_exception)
 
                 subscribe_task = asyncio.create_task(
                     subscribe_handler(ws, msg),
@@ -67,10 +102,18 @@ async def aiter_ws_messages(
     Perform validation for "action" value and check type of "message" value
     without validation of "message" content.
     """
-    while not ws.closed:
+    # Raw frames are received instead of receive_json() to skip its
+    # receive_str() layer and to not parse frames of other types at all.
+    # Iteration stops on close frames.
+    async for msg in ws:
+        if msg.type is WSMsgType.ERROR:
+            break
+
+        if msg.type is not WSMsgType.TEXT:
+            continue
+
         try:
-            raw_message = await ws.receive_json(loads=json.loads)
-            yield validate_raw_message(raw_message)
+            yield validate_raw_message(json.loads(msg.data))
 
         except (TypeError, ValueError):
             # TODO: ask what to do on invalid message
@@ -88,7 +131,7 @@ def validate_raw_message(raw: Any) -> tuple[str, dict[str, Any]]:
 
     action = raw.get("action")
 
-    if action not in (ACTION_SUBSCRIBE, ACTION_ASSETS):
+    if action not in ACTIONS:
         raise ValueError(f"Invalid action: {action!r}")
 
     message = raw.get("message")
@@ -99,46 +142,62 @@ def validate_raw_message(raw: Any) -> tuple[str, dict[str, Any]]:
     return action, message
 
 
-async def send_ws_message(ws: WebSocketResponse, msg: dict[str, Any]) -> None:
-    await ws.send_json(msg, dumps=json.dumps)
-
-
-async def assets_handler(ws: WebSocketResponse) -> None:
+async def assets_handler(ws: JSONWebSocketResponse) -> None:
     """Handle "assets" action."""
     log.debug("Send available assets")
     assets = await get_available_assets()
-    resp_message = build_assets_message(assets)
-    await send_ws_message(ws, resp_message)
+    await ws.send_encoded(build_assets_frame(assets))
 
 
 async def subscribe_handler(
-    ws: WebSocketResponse,
+    ws: JSONWebSocketResponse,
     msg: dict[str, Any],
 ) -> None:
     """Handle "subscribe" action."""
-    asset: Asset | None
     asset_id = msg.get("assetId")
 
-    if isinstance(asset_id, int):
-        asset = await get_asset_by_id(asset_id)
+    if not isinstance(asset_id, int):
+        # TODO: ask what to do if asset_id is invalid
+        return
+
+    # assets are cached by storage, so lookup does not hit database
+    asset = await get_asset_by_id(asset_id)
 
     if asset is None:
-        # TODO: ask what to do if asset not found (and asset_id is invalid)
+        # TODO: ask what to do if asset not found
         return
 
     log.debug("Send history for %s", asset.symbol)
     history_points = await get_asset_history(asset)
-    resp_message = build_asset_history_message(history_points)
-    await send_ws_message(ws, resp_message)
+    await ws.send_encoded(build_asset_history_frame(history_points))
 
     log.debug("Subscribe for %s updates", asset.symbol)
     async with channels.subscribe(asset.symbol) as sub:
-        while True:
-            point = await sub.get()
-            await send_ws_message(ws, build_point_message(point))
+        # client opts in to receive all pending points in one message
+        if msg.get("batch") is True:
+            await _send_points_batches(ws, sub)
+
+        else:
+            await _send_points(ws, sub)
+
 
+async def _send_points(ws: JSONWebSocketResponse, sub: Subscription) -> None:
+    while True:
+        # wait only for the first point, then take already buffered ones
+        for point in [await sub.get(), *sub.drain()]:
+            await ws.send_encoded(build_point_frame(point))
 
-def build_assets_message(assets: list[Asset]) -> dict[str, Any]:
+
+async def _send_points_batches(
+    ws: JSONWebSocketResponse,
+    sub: Subscription,
+) -> None:
+    while True:
+        points = [await sub.get(), *sub.drain(POINTS_BATCH_MAX_SIZE - 1)]
+        await ws.send_encoded(encode_points(build_points_message(points)))
+
+
+def build_assets_message(assets: tuple[Asset, ...]) -> dict[str, Any]:
     """Return outcome message in response to "assets" action."""
     return {
         "action": "assets",
@@ -148,16 +207,55 @@ def build_assets_message(assets: list[Asset]) -> dict[str, Any]:
     }
 
 
+# Storage returns the same assets until they are reloaded, so the message
+# is encoded once per reload and only the latest frame is kept.
+@lru_cache(maxsize=1)
+def build_assets_frame(assets: tuple[Asset, ...]) -> bytes:
+    """Return encoded outcome message in response to "assets" action."""
+    return json.dumpb(build_assets_message(assets))
+
+
 def build_asset_history_message(points: list[HistoryPoint]) -> dict[str, Any]:
-    """Return outcome message in first response to "subscribe" action."""
+    """Return outcome message in first response to "subscribe" action.
+
+    Points are left as is to be serialized by encoder, see encode_points().
+    """
     return {
         "action": "asset_history",
         "message": {
-            "points": [serialize_point(i) for i in points],
+            "points": points,
+        },
+    }
+
+
+def build_asset_history_frame(points: list[HistoryPoint]) -> bytes:
+    """Return encoded outcome message in first response to "subscribe"."""
+    return encode_points(build_asset_history_message(points))
+
+
+def build_points_message(points: list[HistoryPoint]) -> dict[str, Any]:
+    """Return outcome message with batch of asset updates.
+
+    Points are left as is to be serialized by encoder, see encode_points().
+    """
+    return {
+        "action": "points",
+        "message": {
+            "points": points,
         },
     }
 
 
+def encode_points(msg: dict[str, Any]) -> bytes:
+    """Return encoded outcome message which contains history points.
+
+    HistoryPoint is not supported by orjson natively, so every point is
+    passed to serialize_point() during encoding, without building a list
+    of serialized points first.
+    """
+    return json.dumpb(msg, default=serialize_point)
+
+
 def build_point_message(point: HistoryPoint) -> dict[str, Any]:
     """Return outcome message with notification about asset update."""
     return {
@@ -166,6 +264,30 @@ def build_point_message(point: HistoryPoint) -> dict[str, Any]:
     }
 
 
+# The same point is sent to all subscribers of the asset, so the encoded
+# message is cached to encode every point only once.
+@lru_cache(maxsize=POINT_FRAMES_CACHE_SIZE)
+def build_point_frame(point: HistoryPoint) -> bytes:
+    """Return encoded outcome message with notification about asset update.
+
+    Equals to encoded build_point_message() result, but only variable parts
+    of the message are encoded.
+    """
+    return b'%s"time":%d,"value":%s}}' % (
+        _point_frame_prefix(point.asset),
+        point.timestamp,
+        json.dumpb(point.float_value),
+    )
+
+
+@cache
+def _point_frame_prefix(asset: Asset) -> bytes:
+    return b'{"action":"point","message":{"assetId":%d,"assetName":%s,' % (
+        asset.id,
+        json.dumpb(asset.symbol),
+    )
+
+
 def serialize_asset(asset: Asset) -> dict[str, Any]:
     return {
         "id": asset.id,
@@ -178,10 +300,15 @@ def serialize_point(point: HistoryPoint) -> dict[str, Any]:
         "assetId": point.asset.id,
         "assetName": point.asset.symbol,
         "time": point.timestamp,
-        "value": float(point.value),
+        "value": point.float_value,
     }
 
 
+def _log_task_exception(task: asyncio.Task[Any]) -> None:
+    if not task.cancelled() and (exc := task.exception()) is not None:
+        log.error("Subscription task failed", exc_info=exc)
+
+
 async def _cancel_task(task: asyncio.Task[Any]) -> None:
     # TODO: check if task is running
     task.cancel()
@@ -17,3 +17,32 @@ INSERT INTO assets (symbol) VALUES
     ('GBPUSD'),
     ('AUDUSD'),
     ('USDCAD');
+
+-- Notify subscribers of the asset's channel about new history point.
+-- Payload format: tab separated asset_id, timestamp, value and symbol
+CREATE FUNCTION notify_history_point() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        symbol,
+        concat_ws(
+            E'\t',
+            NEW.asset_id,
+            date_part('epoch', NEW.timestamp)::integer,
+            NEW.value,
+            symbol
+        )
+    )
+    FROM assets
+    WHERE id = NEW.asset_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Notifications are sent only for inserts made by sessions which enable
+-- them, so rows are not queued for notify when nobody listens.
+CREATE TRIGGER history_points_notify
+    AFTER INSERT ON history_points
+    FOR EACH ROW
+    WHEN (current_setting('assetsrates.notify_history_points', true) = 'on')
+    EXECUTE FUNCTION notify_history_point();
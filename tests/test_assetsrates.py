@@ -3,12 +3,12 @@ import json
 from collections import defaultdict, deque
 from decimal import Decimal
 from itertools import chain, repeat
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 import pytest
 
-from assetsrates import app, pubsub
-from assetsrates.storage import Asset
+from assetsrates import app, pubsub, ratescrawler, websockets
+from assetsrates.storage import Asset, HistoryPoint
 
 
 @pytest.fixture
@@ -21,7 +21,10 @@ def patch_rates_request():
 @pytest.fixture
 def cli(patch_rates_request, event_loop, aiohttp_client):
     # TODO: add tests for app startup/cleanup
-    with patch.object(app.storage, "create_pool"):
+    with (
+        patch.object(app.storage, "create_pool"),
+        patch.object(app.storage, "listen_history_points"),
+    ):
         aiohttp_app = app.create_app()
         cli = event_loop.run_until_complete(aiohttp_client(aiohttp_app))
 
@@ -99,7 +102,11 @@ FAKE_STORAGE[Asset(5, "USDCAD")]
 
 
 async def fake_get_available_assets():
-    return list(FAKE_STORAGE.keys())
+    return tuple(FAKE_STORAGE.keys())
+
+
+async def fake_get_assets_by_symbol():
+    return {i.symbol: i for i in await fake_get_available_assets()}
 
 
 async def fake_get_asset_by_id(id):
@@ -123,7 +130,7 @@ async def fake_get_asset_history(asset):
 @pytest.mark.asyncio
 @patch.multiple(
     "assetsrates.ratescrawler",
-    get_available_assets=fake_get_available_assets,
+    get_assets_by_symbol=fake_get_assets_by_symbol,
     save_points=fake_save_points,
 )
 @patch.multiple(
@@ -132,14 +139,7 @@ async def fake_get_asset_history(asset):
     get_asset_history=fake_get_asset_history,
     get_available_assets=fake_get_available_assets,
 )
-@patch("assetsrates.pubsub.subscription_manager")
-async def test_assetsrates(
-    subscription_manager_mock,
-    patch_rates_request,
-    cli,
-):
-    subscription_manager_mock.subscribe.return_value = AsyncMock()
-
+async def test_assetsrates(patch_rates_request, cli):
     async with cli.ws_connect("/") as ws:
         # No initial messages
         with pytest.raises(asyncio.TimeoutError):
@@ -293,3 +293,108 @@ async def test_assetsrates(
         # No additional messages
         with pytest.raises(asyncio.TimeoutError):
             await asyncio.wait_for(ws.receive_str(), 0.01)
+
+
+@pytest.mark.asyncio
+@patch.multiple(
+    "assetsrates.ratescrawler",
+    get_assets_by_symbol=fake_get_assets_by_symbol,
+    save_points=fake_save_points,
+)
+@patch.multiple(
+    "assetsrates.websockets",
+    get_asset_by_id=fake_get_asset_by_id,
+    get_asset_history=fake_get_asset_history,
+)
+async def test_subscribe_batch(cli):
+    asset = Asset(3, "GBPUSD")
+
+    async with cli.ws_connect("/") as ws:
+        await ws.send_str(
+            json.dumps(
+                {
+                    "action": "subscribe",
+                    "message": {"assetId": 3, "batch": True},
+                }
+            )
+        )
+        resp = json.loads(await ws.receive_str())
+        assert resp == {"action": "asset_history", "message": {"points": []}}
+
+        # Points published before subscriber wakes up are sent in one message
+        for ts in (1, 2):
+            point = HistoryPoint(asset, ts, Decimal(ts), float(ts))
+            pubsub.channels.publish(asset.symbol, point)
+
+        resp = json.loads(await asyncio.wait_for(ws.receive_str(), 0.1))
+        assert resp == {
+            "action": "points",
+            "message": {
+                "points": [
+                    {
+                        "assetId": 3,
+                        "assetName": "GBPUSD",
+                        "time": 1,
+                        "value": 1.0,
+                    },
+                    {
+                        "assetId": 3,
+                        "assetName": "GBPUSD",
+                        "time": 2,
+                        "value": 2.0,
+                    },
+                ]
+            },
+        }
+
+        # No additional messages
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ws.receive_str(), 0.01)
+
+
+@pytest.mark.parametrize(
+    "point",
+    [
+        HistoryPoint(Asset(1, "EURUSD"), 1, Decimal("0.3"), 0.3),
+        HistoryPoint(Asset(2, 'US"D\\JPY'), 2, Decimal("1E+20"), 1e20),
+    ],
+)
+def test_build_point_frame(point):
+    frame = websockets.build_point_frame(point)
+    assert json.loads(frame) == websockets.build_point_message(point)
+
+
+@pytest.mark.parametrize(
+    "action",
+    [websockets.ACTION_ASSETS, websockets.ACTION_SUBSCRIBE],
+)
+def test_validate_raw_message(action):
+    raw = json.loads(json.dumps({"action": action, "message": {}}))
+    assert websockets.validate_raw_message(raw) == (action, {})
+
+
+def test_parse_raw_large_value():
+    assets = {
+        "EURUSD": Asset(1, "EURUSD"),
+        "USDJPY": Asset(2, "USDJPY"),
+        "GBPUSD": Asset(3, "GBPUSD"),
+        "AUDUSD": Asset(4, "AUDUSD"),
+    }
+    raw = json.dumps(
+        {
+            "Rates": [
+                {"Symbol": "EURUSD", "Bid": 1e21, "Ask": 1e21},
+                {"Symbol": "USDJPY", "Bid": 0.1, "Ask": 0.2},
+                {"Symbol": "GBPUSD", "Bid": "1.2", "Ask": "1.4"},
+                {"Symbol": "AUDUSD", "Bid": 1.7e308, "Ask": 1.7e308},
+            ]
+        }
+    ).encode()
+
+    points = ratescrawler.parse_raw(b"null(%s);" % raw, 1, assets)
+    assert [i.value for i in points] == [
+        Decimal("1E+21"),
+        Decimal("0.15"),
+        Decimal("1.3"),
+        Decimal(1.7e308),
+    ]
@@ -1,16 +1,13 @@
 import asyncio
-from unittest.mock import AsyncMock, call, patch, sentinel
+from unittest.mock import sentinel
 
 import pytest
 
-from assetsrates.pubsub import channels
+from assetsrates.pubsub import SUBSCRIBER_QUEUE_MAXSIZE, channels
 
 
 @pytest.mark.asyncio
-@patch("assetsrates.pubsub.subscription_manager")
-async def test_pubsub(subscription_manager_mock):
-    subscription_manager_mock.subscribe.return_value = AsyncMock()
-
+async def test_pubsub():
     async with (
         channels.subscribe("channel_A") as sub_a_1,
         channels.subscribe("channel_A") as sub_a_2,
@@ -53,15 +50,56 @@ async def test_pubsub(subscription_manager_mock):
         with pytest.raises(asyncio.TimeoutError):
             await asyncio.wait_for(sub_b_1.get(), 0.01)
 
-    # Check storage.subscription_manager calls
-    assert subscription_manager_mock.subscribe.mock_calls == [
-        call("channel_A", channels.publish),
-        call().__aenter__(),
-        call("channel_A", channels.publish),
-        call().__aenter__(),
-        call("channel_B", channels.publish),
-        call().__aenter__(),
-        call().__aexit__(None, None, None),
-        call().__aexit__(None, None, None),
-        call().__aexit__(None, None, None),
-    ]
+    # Channels without subscribers are removed
+    assert channels._channels == {}
+
+
+@pytest.mark.asyncio
+async def test_subscription_overflow():
+    async with channels.subscribe("channel_A") as sub:
+        for i in range(SUBSCRIBER_QUEUE_MAXSIZE + 1):
+            channels.publish("channel_A", i)
+
+        # The oldest unread messages are lost
+        for i in range(1, SUBSCRIBER_QUEUE_MAXSIZE + 1):
+            assert await sub.get() == i
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sub.get(), 0.01)
+
+        # Waiting subscriber is woken up by new message
+        get_task = asyncio.create_task(sub.get())
+        await asyncio.sleep(0)
+        channels.publish("channel_A", sentinel.message)
+        assert await asyncio.wait_for(get_task, 0.01) == sentinel.message
+
+
+@pytest.mark.asyncio
+async def test_subscription_drain():
+    async with channels.subscribe("channel_A") as sub:
+        assert sub.drain() == []
+
+        for i in range(5):
+            channels.publish("channel_A", i)
+
+        assert sub.drain(3) == [0, 1, 2]
+        assert sub.drain() == [3, 4]
+        assert sub.drain() == []
+
+        # New subscriber gets only new messages
+        async with channels.subscribe("channel_A") as sub_2:
+            channels.publish("channel_A", 5)
+            assert sub.drain() == sub_2.drain() == [5]
+
+
+@pytest.mark.asyncio
+async def test_pubsub_unsubscribe():
+    async with channels.subscribe("channel_A") as sub_1:
+        async with channels.subscribe("channel_A"):
+            pass
+
+        # Left subscriber still gets new messages
+        channels.publish("channel_A", sentinel.message)
+        assert await asyncio.wait_for(sub_1.get(), 0.01) == sentinel.message
+
+    assert channels._channels == {}
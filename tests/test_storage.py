@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+import pytest
+
+from assetsrates.storage import Asset, HistoryPoint, _load_history_point
+
+
+@pytest.mark.parametrize(
+    ("payload", "point"),
+    [
+        (
+            "1\t1700000000\t0.30000000\tEURUSD",
+            HistoryPoint(
+                Asset(1, "EURUSD"),
+                1700000000,
+                Decimal("0.30000000"),
+                0.3,
+            ),
+        ),
+        # symbol is the last field, so it may contain tabs
+        (
+            "2\t1700000001\t151.5\tUSD\tJPY",
+            HistoryPoint(
+                Asset(2, "USD\tJPY"),
+                1700000001,
+                Decimal("151.5"),
+                151.5,
+            ),
+        ),
+    ],
+)
+def test_load_history_point(payload, point):
+    # payload fields are in "notify_history_point" trigger order:
+    # asset_id, timestamp, value, symbol
+    assert _load_history_point(payload) == point